@@ -5,11 +5,13 @@ and publishes simplified data to the central broker.
 Also publishes Home Assistant autodiscovery messages for new meters.
 """
 
-import json
 import logging
+import socket
 import time
 from collections import OrderedDict
+from collections.abc import Callable
 
+import orjson
 import paho.mqtt.client as mqtt
 
 from src.config import AppConfig
@@ -21,8 +23,19 @@ logger = logging.getLogger(__name__)
 # Keys excluded from zero-value check (metadata fields)
 METADATA_KEYS = {"id", "time", "isend"}
 
+# Device ID used when a message carries no "id" field; never announced via HA discovery
+UNKNOWN_DEVICE_ID = "unknown"
+
 BACKOFF_BASE = 1
 BACKOFF_MAX = 60
+# paho allows 20 unacknowledged QoS>0 publishes by default; after a central broker reconnect the queued
+# data and discovery messages of a whole fleet should not be throttled by that window
+CENTRAL_MAX_INFLIGHT = 200
+
+
+def _set_tcp_nodelay(client: mqtt.Client, userdata, sock) -> None:
+    """Disable Nagle on a freshly opened broker socket; the bridge sends small JSON messages."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
 
 class MqttBridge:
@@ -30,6 +43,25 @@ class MqttBridge:
         self.config = config
         self.discovered_meters: set[str] = set()
         self._seen_messages: OrderedDict[str, bool] = OrderedDict()
+        # Byte patterns of excluded ids, so their messages are dropped without parsing the JSON.
+        # Meters send compact JSON; the spaced form covers json.dumps defaults. Other layouts fall through
+        # to the check after parsing.
+        self._excluded_id_markers: tuple[bytes, ...] = tuple(
+            marker.encode()
+            for device_id in config.kpm33b_meters.exclude_device_ids or ()
+            for marker in (f'"id":"{device_id}"', f'"id": "{device_id}"')
+        )
+        # Checked for every message; bound once instead of walking the config models each time
+        self._excluded_devices: frozenset[str] = config.kpm33b_meters.exclude_device_ids or frozenset()
+        # Central target topic per (device_id, suffix); config does not change at runtime
+        self._target_topics: dict[tuple[str, str], str] = {}
+        topics = config.internal_broker_topics
+        central_topics = config.central_broker_topics
+        # Internal topic -> (transform function, central topic suffix, publish QoS)
+        self._topic_dispatch: dict[str, tuple[Callable[[dict], dict], str, int]] = {
+            topics.meter_seconds_data: (transform_rt_data, "seconds", central_topics.qos_seconds),
+            topics.meter_minutes_data: (transform_eny_now, "minutes", central_topics.qos_minutes),
+        }
         self._setup_internal_client()
         self._setup_central_client()
 
@@ -37,6 +69,7 @@ class MqttBridge:
         self.internal_client = mqtt.Client(client_id="kpm33b_proxy_internal", protocol=mqtt.MQTTv311)
         if self.config.internal_broker.username:
             self.internal_client.username_pw_set(self.config.internal_broker.username, self.config.internal_broker.password)
+        self.internal_client.on_socket_open = _set_tcp_nodelay
         self.internal_client.on_connect = self._on_internal_connect
         self.internal_client.on_disconnect = self._on_internal_disconnect
         self.internal_client.on_message = self._on_internal_message
@@ -45,6 +78,8 @@ class MqttBridge:
         self.central_client = mqtt.Client(client_id="kpm33b_proxy_central", protocol=mqtt.MQTTv311)
         if self.config.central_broker.username:
             self.central_client.username_pw_set(self.config.central_broker.username, self.config.central_broker.password)
+        self.central_client.max_inflight_messages_set(CENTRAL_MAX_INFLIGHT)
+        self.central_client.on_socket_open = _set_tcp_nodelay
         self.central_client.on_connect = self._on_central_connect
         self.central_client.on_disconnect = self._on_central_disconnect
 
@@ -87,6 +122,15 @@ class MqttBridge:
             return f"{main_topic}/{context}/{device_id}"
         return f"{main_topic}/{device_id}"
 
+    def _get_target_topic(self, device_id: str, suffix: str) -> str:
+        """Return the central topic for a device's data, building it on first use."""
+        key = (device_id, suffix)
+        target_topic = self._target_topics.get(key)
+        if target_topic is None:
+            target_topic = f"{self._build_topic_prefix(device_id)}/{suffix}"
+            self._target_topics[key] = target_topic
+        return target_topic
+
     def _is_zero_value_message(self, raw: dict) -> bool:
         """Check if all data values (excluding metadata) are zero or empty.
 
@@ -124,71 +168,68 @@ class MqttBridge:
 
     def _on_internal_message(self, client: mqtt.Client, userdata, msg: mqtt.MQTTMessage) -> None:
         topic = msg.topic
+        payload = msg.payload
+        if self._excluded_id_markers and any(marker in payload for marker in self._excluded_id_markers):
+            logger.debug("Ignoring message from excluded device on topic %s", topic)
+            return
+
         try:
-            raw = json.loads(msg.payload)
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON on topic %s: %s", topic, msg.payload[:200])
+            raw = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.error("Invalid JSON on topic %s: %s", topic, payload[:200].decode("utf-8", errors="replace"))
             return
 
         # Filter zero-value messages (KPM33B bug workaround)
         if self._is_zero_value_message(raw):
-            device_id = raw.get("id", "unknown")
-            logger.debug("Ignoring zero-value message from device %s", device_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Ignoring zero-value message from device %s", raw.get("id", UNKNOWN_DEVICE_ID))
             return
 
         # Filter duplicate messages (same device_id + timestamp)
-        device_id = raw.get("id", "unknown")
+        device_id = raw.get("id", UNKNOWN_DEVICE_ID)
         timestamp = raw.get("time", "")
         if self._is_duplicate_message(device_id, timestamp):
             return
 
-        topics = self.config.internal_broker_topics
-        main_topic = self.config.central_broker_topics.external_main_topic
+        dispatch = self._topic_dispatch.get(topic)
+        if dispatch is None:
+            logger.debug("Ignoring message on unhandled topic %s", topic)
+            return
+        transform, suffix, qos = dispatch
 
         try:
-            if topic == topics.meter_seconds_data:
-                transformed = transform_rt_data(raw)
-                device_id = transformed.get("id", "unknown")
-                topic_prefix = self._build_topic_prefix(device_id)
-                target_topic = f"{topic_prefix}/seconds"
-            elif topic == topics.meter_minutes_data:
-                transformed = transform_eny_now(raw)
-                device_id = transformed.get("id", "unknown")
-                topic_prefix = self._build_topic_prefix(device_id)
-                target_topic = f"{topic_prefix}/minutes"
-            else:
-                logger.debug("Ignoring message on unhandled topic %s", topic)
-                return
+            transformed = transform(raw)
         except IsendError as e:
             logger.error("Data validation error on topic %s: %s", topic, e)
             return
+        device_id = transformed.get("id", UNKNOWN_DEVICE_ID)
 
         # Filter out excluded device IDs (e.g., fake devices)
-        excluded_devices = self.config.kpm33b_meters.exclude_device_ids
-        if excluded_devices and device_id in excluded_devices:
+        if device_id in self._excluded_devices:
             logger.debug("Ignoring message from excluded device %s", device_id)
             return
 
         # Publish HA autodiscovery on first message from a new meter
-        if device_id not in self.discovered_meters and device_id != "unknown":
+        if device_id not in self.discovered_meters and device_id != UNKNOWN_DEVICE_ID:
             self.discovered_meters.add(device_id)
             context = self._get_device_context(device_id)
             logger.info("New meter discovered: %s — publishing HA autodiscovery", device_id)
             publish_discovery(
                 self.central_client,
                 device_id,
-                main_topic,
+                self.config.central_broker_topics.external_main_topic,
                 context,
                 self.config.kpm33b_meters.upload_frequency_seconds,
                 self.config.kpm33b_meters.upload_frequency_minutes,
             )
 
-        payload = json.dumps(transformed)
-        result = self.central_client.publish(target_topic, payload, qos=1)
-        if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            logger.debug("Published to %s", target_topic)
-        else:
+        target_topic = self._get_target_topic(device_id, suffix)
+        result = self.central_client.publish(target_topic, orjson.dumps(transformed), qos=qos)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
             logger.error("Publish to %s failed: rc=%d", target_topic, result.rc)
+        elif logger.isEnabledFor(logging.DEBUG):
+            # Runs for every message; skip building the log call in the usual INFO deployment
+            logger.debug("Published to %s", target_topic)
 
     def connect(self) -> None:
         """Connect to both brokers with retry logic."""
@@ -2,6 +2,7 @@
 
 import logging
 from pathlib import Path
+from typing import Literal
 
 import yaml
 from pydantic import BaseModel, field_validator
@@ -10,6 +11,15 @@ logger = logging.getLogger(__name__)
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+# Parsed configs keyed by (path, inode, mtime_ns, size), so reloading an unchanged file skips YAML parsing and
+# validation. The inode catches an editor's atomic replace that keeps size and mtime.
+_config_cache: dict[tuple[Path, int, int, int], "AppConfig"] = {}
+
 
 class BrokerConfig(BaseModel):
     host: str
@@ -28,6 +38,8 @@ class InternalBrokerTopics(BaseModel):
 class CentralBrokerTopics(BaseModel):
     external_main_topic: str
     status_topic: str
+    qos_seconds: Literal[0, 1, 2] = 0
+    qos_minutes: Literal[0, 1, 2] = 1
 
 
 class LoggingConfig(BaseModel):
@@ -46,7 +58,8 @@ class LoggingConfig(BaseModel):
 class MeterConfig(BaseModel):
     upload_frequency_seconds: int
     upload_frequency_minutes: int
-    exclude_device_ids: list[str] | None = None
+    # Checked for every inbound message; a frozenset makes the membership test O(1)
+    exclude_device_ids: frozenset[str] | None = None
     device_contexts: dict[str, str] | None = None
     duplicate_dict_max_length: int = 30
 
@@ -61,10 +74,19 @@ class AppConfig(BaseModel):
 
 
 def load_config(config_path: Path | None = None) -> AppConfig:
+    """Load and validate config.yaml, returning the cached AppConfig if the file is unchanged."""
     if config_path is None:
         config_path = PROJECT_ROOT / "config.yaml"
-    if not config_path.exists():
-        raise FileNotFoundError(f"Configuration file not found: {config_path}")
-    with config_path.open() as f:
-        raw = yaml.safe_load(f)
-    return AppConfig(**raw)
+    try:
+        stat = config_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Configuration file not found: {config_path}") from None
+    key = (config_path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    config = _config_cache.get(key)
+    if config is None:
+        with config_path.open() as f:
+            raw = yaml.load(f, Loader=_YamlLoader)
+        config = AppConfig(**raw)
+        _config_cache.clear()  # only the latest version of a file is ever reloaded
+        _config_cache[key] = config
+    return config
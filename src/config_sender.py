@@ -4,16 +4,20 @@ Discovers meters via central broker, sends upload frequency configuration
 to meters via internal broker, and verifies acknowledgements.
 """
 
-import json
 import logging
 import os
+import queue
+import re
 import threading
 import time
-import uuid
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from secrets import token_hex
 
+import orjson
 import paho.mqtt.client as mqtt
-
-from src.config import AppConfig, PROJECT_ROOT
+from src.config import AppConfig, PROJECT_ROOT, load_config
+from src.file_watch import FileWatch
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +26,13 @@ BACKOFF_MAX = 60
 ACK_TIMEOUT = 15.0
 
 
+# (meter_ids, commands); commands None means both upload frequencies from the current config
+ConfigJob = tuple[list[str], list[tuple[str, str]] | None]
+
+
 def _make_oprid() -> str:
     """Generate a 32-char hex nonce for oprid."""
-    return uuid.uuid4().hex
+    return token_hex(16)
 
 
 def _meter_id_last8(meter_id: str) -> str:
@@ -35,15 +43,29 @@ class ConfigSender:
     def __init__(self, config: AppConfig):
         self.config = config
         self.known_meters: set[str] = set()
-        self._pending_acks: dict[str, threading.Event] = {}
-        self._lock = threading.Lock()
-        self._config_mtime: float = 0.0
+        # oprid -> future resolved with the ack payload. dict get/set/pop are atomic, so no lock is needed;
+        # whichever side pops the entry first (ack callback or timeout) owns it.
+        self._pending_acks: dict[str, Future] = {}
+        self._settime_topics: dict[str, str] = {}
+        # (inode, size, mtime_ns) of config.yaml when last checked; None until the first check
+        self._config_signature: tuple[int, int, int] | None = None
         self._config_path = PROJECT_ROOT / "config.yaml"
         self._stop_event = threading.Event()
+        self._monitor_thread: threading.Thread | None = None
+        self._config_watch: FileWatch | None = None
+        self._config_thread: threading.Thread | None = None
+        # Work for the config worker: a discovered meter ID (gets both frequencies), a (meter_ids, commands)
+        # job from a config reload, or None as the shutdown sentinel. Keeps the blocking ack waits off the
+        # paho network threads and the config monitor thread.
+        self._config_queue: queue.Queue[str | ConfigJob | None] = queue.Queue()
         self._setup_central_client()
         self._setup_internal_client()
 
     def _setup_central_client(self) -> None:
+        main_topic = self.config.central_broker_topics.external_main_topic
+        self._discovery_topic = f"{main_topic}/+/seconds"
+        # Matches exactly the topics delivered for the discovery subscription, capturing the meter ID
+        self._discovery_topic_re = re.compile(rf"{re.escape(main_topic)}/([^/]+)/seconds")
         self.central_client = mqtt.Client(client_id="kpm33b_config_central", protocol=mqtt.MQTTv311)
         if self.config.central_broker.username:
             self.central_client.username_pw_set(self.config.central_broker.username, self.config.central_broker.password)
@@ -64,9 +86,8 @@ class ConfigSender:
             logger.error("Central broker connection failed: rc=%d", rc)
             return
         logger.info("Config sender connected to central broker")
-        discovery_topic = f"{self.config.central_broker_topics.external_main_topic}/+/seconds"
-        client.subscribe(discovery_topic)
-        logger.info("Subscribed to %s for meter discovery", discovery_topic)
+        client.subscribe(self._discovery_topic)
+        logger.info("Subscribed to %s for meter discovery", self._discovery_topic)
 
     def _on_central_disconnect(self, client: mqtt.Client, userdata, rc: int) -> None:
         if rc != 0:
@@ -74,14 +95,14 @@ class ConfigSender:
 
     def _on_central_message(self, client: mqtt.Client, userdata, msg: mqtt.MQTTMessage) -> None:
         """Handle discovery messages from central broker."""
-        parts = msg.topic.split("/")
-        if len(parts) < 3:
+        match = self._discovery_topic_re.fullmatch(msg.topic)
+        if match is None:
             return
-        meter_id = parts[-2]
+        meter_id = match.group(1)
         if meter_id not in self.known_meters:
             logger.info("Discovered new meter: %s", meter_id)
             self.known_meters.add(meter_id)
-            self._send_config_to_meter(meter_id)
+            self._config_queue.put(meter_id)
 
     def _on_internal_connect(self, client: mqtt.Client, userdata, flags, rc: int) -> None:
         if rc != 0:
@@ -99,68 +120,142 @@ class ConfigSender:
     def _on_internal_message(self, client: mqtt.Client, userdata, msg: mqtt.MQTTMessage) -> None:
         """Handle ack messages from meters on the internal broker."""
         try:
-            payload = json.loads(msg.payload)
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON ack on %s: %s", msg.topic, msg.payload[:200])
+            payload = orjson.loads(msg.payload)
+        except orjson.JSONDecodeError:
+            logger.error("Invalid JSON ack on %s: %s", msg.topic, msg.payload[:200].decode("utf-8", errors="replace"))
             return
         oprid = payload.get("oprid")
         if oprid is None:
             return
-        with self._lock:
-            event = self._pending_acks.pop(oprid, None)
-        if event is not None:
-            event.set()
+        ack = self._pending_acks.pop(oprid, None)
+        if ack is not None:
+            ack.set_result(payload)
 
     def _send_config_to_meter(self, meter_id: str) -> None:
         """Send seconds and minutes upload frequency config to a single meter."""
-        last8 = _meter_id_last8(meter_id)
-        topic_prefix = self.config.internal_broker_topics.meter_settime
-        topic = f"{topic_prefix}{last8}"
-        meters_cfg = self.config.kpm33b_meters
-
-        self._send_command(topic, meter_id, cmd="0000", value=str(meters_cfg.upload_frequency_seconds))
-        self._send_command(topic, meter_id, cmd="0001", value=str(meters_cfg.upload_frequency_minutes))
-
-    def _send_command(self, topic: str, meter_id: str, cmd: str, value: str) -> None:
+        self._send_config_to_meters([meter_id])
+
+    def _send_config_to_meters(self, meter_ids: list[str], commands: list[tuple[str, str]] | None = None) -> None:
+        """Send upload frequency config to several meters and wait for all acks.
+
+        Args:
+            meter_ids: Meters to configure
+            commands: (Cmd, value) pairs to send; defaults to both upload frequencies from the current config
+        """
+        self._send_config_jobs([(meter_ids, commands)])
+
+    def _send_config_jobs(self, jobs: list[ConfigJob]) -> None:
+        """Publish the commands of all jobs, then wait for their acks.
+
+        All commands are published back-to-back before any ack is awaited, and the
+        waits share one deadline, so the whole batch takes at most ACK_TIMEOUT.
+        """
+        pending: list[tuple[str, str, str, Future]] = []
+        for meter_ids, commands in jobs:
+            if commands is None:
+                meters_cfg = self.config.kpm33b_meters
+                commands = [
+                    ("0000", str(meters_cfg.upload_frequency_seconds)),
+                    ("0001", str(meters_cfg.upload_frequency_minutes)),
+                ]
+            for meter_id in meter_ids:
+                topic = self._settime_topics.get(meter_id)
+                if topic is None:
+                    topic = f"{self.config.internal_broker_topics.meter_settime}{_meter_id_last8(meter_id)}"
+                    self._settime_topics[meter_id] = topic
+                for cmd, value in commands:
+                    try:
+                        sent = self._publish_command(topic, meter_id, cmd, value)
+                    except Exception:
+                        logger.exception("Sending config command %s to meter %s failed", cmd, meter_id)
+                        continue
+                    if sent is not None:
+                        pending.append(sent)
+
+        deadline = time.monotonic() + ACK_TIMEOUT
+        for meter_id, cmd_label, oprid, ack in pending:
+            self._await_ack(ack, meter_id, cmd_label, oprid, max(0.0, deadline - time.monotonic()))
+
+    def _publish_command(self, topic: str, meter_id: str, cmd: str, value: str) -> tuple[str, str, str, Future] | None:
+        """Publish one config command and register its pending ack.
+
+        Returns (meter_id, cmd_label, oprid, ack future), or None if the publish failed.
+        """
         oprid = _make_oprid()
-        payload = json.dumps({"oprid": oprid, "Cmd": cmd, "value": value, "types": "1"})
+        payload = orjson.dumps({"oprid": oprid, "Cmd": cmd, "value": value, "types": "1"})
 
-        ack_event = threading.Event()
-        with self._lock:
-            self._pending_acks[oprid] = ack_event
+        ack: Future = Future()
+        self._pending_acks[oprid] = ack
 
-        result = self.internal_client.publish(topic, payload, qos=1)
+        try:
+            result = self.internal_client.publish(topic, payload, qos=1)
+        except Exception:
+            self._pending_acks.pop(oprid, None)
+            raise
         cmd_label = "seconds" if cmd == "0000" else "minutes"
         if result.rc != mqtt.MQTT_ERR_SUCCESS:
             logger.error("Publish config %s to %s failed: rc=%d", cmd_label, topic, result.rc)
-            with self._lock:
-                self._pending_acks.pop(oprid, None)
-            return
+            self._pending_acks.pop(oprid, None)
+            return None
 
         logger.info("Sent %s config to meter %s (oprid=%s, value=%s)", cmd_label, meter_id, oprid, value)
+        return meter_id, cmd_label, oprid, ack
 
-        if ack_event.wait(timeout=ACK_TIMEOUT):
-            logger.info("Ack received for meter %s %s config (oprid=%s)", meter_id, cmd_label, oprid)
-        else:
+    def _await_ack(self, ack: Future, meter_id: str, cmd_label: str, oprid: str, timeout: float) -> None:
+        try:
+            ack.result(timeout=timeout)
+        except FutureTimeoutError:
             logger.log(logging.CRITICAL, "ALERT: No ack from meter %s for %s config (oprid=%s) within %.0fs",
                         meter_id, cmd_label, oprid, ACK_TIMEOUT)
-            with self._lock:
-                self._pending_acks.pop(oprid, None)
+            self._pending_acks.pop(oprid, None)
+        else:
+            logger.info("Ack received for meter %s %s config (oprid=%s)", meter_id, cmd_label, oprid)
 
     def _check_config_mtime(self) -> None:
-        """Check if config.yaml was modified and re-send config to all known meters."""
+        """Check if config.yaml was modified and reload it if so.
+
+        Any change of inode, size or mtime counts, so an editor's atomic replace, a restored older file
+        and an edit within the filesystem's timestamp resolution are all picked up.
+        """
         try:
-            mtime = self._config_path.stat().st_mtime
+            st = self._config_path.stat()
         except OSError:
             return
-        if self._config_mtime == 0.0:
-            self._config_mtime = mtime
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self._config_signature is None:
+            self._config_signature = signature
+            return
+        if signature != self._config_signature:
+            self._config_signature = signature
+            self._reload_config()
+
+    def _reload_config(self) -> None:
+        """Reload config.yaml and send only the upload frequencies that changed to the known meters."""
+        try:
+            new_config = load_config(self._config_path)
+        except Exception as e:  # keep running on the previous config while the file is being edited
+            logger.error("config.yaml changed but could not be loaded, keeping current config: %s", e)
             return
-        if mtime > self._config_mtime:
-            self._config_mtime = mtime
-            logger.info("config.yaml changed, re-sending config to all %d known meters", len(self.known_meters))
-            for meter_id in list(self.known_meters):
-                self._send_config_to_meter(meter_id)
+        old_meters_cfg = self.config.kpm33b_meters
+        new_meters_cfg = new_config.kpm33b_meters
+        self.config = new_config
+        self._settime_topics.clear()
+
+        commands = []
+        if new_meters_cfg.upload_frequency_seconds != old_meters_cfg.upload_frequency_seconds:
+            commands.append(("0000", str(new_meters_cfg.upload_frequency_seconds)))
+        if new_meters_cfg.upload_frequency_minutes != old_meters_cfg.upload_frequency_minutes:
+            commands.append(("0001", str(new_meters_cfg.upload_frequency_minutes)))
+        if not commands:
+            logger.info("config.yaml changed, upload frequencies unchanged — nothing to send")
+            return
+
+        excluded = new_meters_cfg.exclude_device_ids or frozenset()
+        # Snapshot first: the paho thread adds newly discovered meters to known_meters concurrently
+        meter_ids = [meter_id for meter_id in list(self.known_meters) if meter_id not in excluded]
+        logger.info("config.yaml changed, re-sending %d setting(s) to %d known meters", len(commands), len(meter_ids))
+        # The worker sends and waits for acks; this (monitor) thread only detects changes
+        self._config_queue.put((meter_ids, commands))
 
     def connect(self) -> None:
         self._connect_with_backoff(
@@ -194,15 +289,72 @@ class ConfigSender:
         self.internal_client.loop_start()
         self._monitor_thread = threading.Thread(target=self._monitor_config_loop, daemon=True)
         self._monitor_thread.start()
+        self._config_thread = threading.Thread(target=self._config_worker_loop, daemon=True)
+        self._config_thread.start()
         logger.info("Config sender started")
 
+    def _config_worker_loop(self) -> None:
+        """Send queued config until the None sentinel arrives.
+
+        Work queued while a batch was being configured is sent together, so a discovery storm or a
+        reload during discovery shares one ack deadline instead of waiting ACK_TIMEOUT behind each silent meter.
+        """
+        while True:
+            batch = [self._config_queue.get()]
+            while True:
+                try:
+                    batch.append(self._config_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            if stopping:
+                batch = batch[:batch.index(None)]
+            discovered = [item for item in batch if isinstance(item, str)]
+            jobs: list[ConfigJob] = [item for item in batch if isinstance(item, tuple)]
+            if discovered:
+                jobs.insert(0, (discovered, None))
+            if jobs:
+                try:
+                    self._send_config_jobs(jobs)
+                except Exception:
+                    logger.exception("Sending queued config failed")
+            if stopping:
+                return
+
     def _monitor_config_loop(self) -> None:
-        while not self._stop_event.is_set():
+        """Re-check config.yaml whenever it may have changed, until stop() is called.
+
+        With inotify the thread sleeps until the kernel reports an event for the file;
+        otherwise FileWatch wakes it every POLL_INTERVAL seconds.
+        """
+        self._safe_check_config()
+        with FileWatch(self._config_path) as config_watch:
+            self._config_watch = config_watch
+            if self._stop_event.is_set():  # stop() ran before the watch was published
+                return
+            while config_watch.wait():
+                self._safe_check_config()
+
+    def _safe_check_config(self) -> None:
+        """Run one config check; a failure is logged so it cannot end the monitor thread."""
+        try:
             self._check_config_mtime()
-            self._stop_event.wait(timeout=5.0)
+        except Exception:
+            logger.exception("Checking config.yaml for changes failed")
 
-    def stop(self) -> None:
+    def _stop_monitor(self) -> None:
+        """Wake the monitor thread and make it return."""
         self._stop_event.set()
+        config_watch = self._config_watch
+        if config_watch is not None:
+            config_watch.close()
+
+    def stop(self) -> None:
+        self._stop_monitor()
+        self._config_queue.put(None)
+        if self._monitor_thread is not None:
+            # The monitor returns as soon as its watch is closed; joining lets it release its descriptors
+            self._monitor_thread.join(timeout=5.0)
         self.central_client.loop_stop()
         self.internal_client.loop_stop()
         self.central_client.disconnect()
@@ -0,0 +1,79 @@
+"""Shared entry point for the KPM33B service scripts.
+
+Loads config.yaml, configures logging, wires SIGTERM/SIGINT to a clean
+shutdown and keeps the process alive while the MQTT loops run in
+background threads. Used by kpm33b_proxy.py and run_config_sender.py.
+"""
+
+import logging
+import queue
+import signal
+import sys
+from collections.abc import Callable
+from logging.handlers import QueueHandler, QueueListener
+from typing import Protocol
+
+from src.config import AppConfig, load_config
+
+
+class Service(Protocol):
+    def connect(self) -> None: ...
+
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+def setup_logging(level: str) -> QueueListener:
+    """Configure logging to stdout for journalctl management.
+
+    Records are only queued by the logging threads; a QueueListener thread writes them to stdout,
+    so the MQTT callback threads never block on a slow journald pipe. The caller stops the listener
+    on shutdown to flush pending records.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))  # final layout is applied by stream_handler
+    logging.basicConfig(level=getattr(logging, level), handlers=[queue_handler])
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
+def run(factory: Callable[[AppConfig], Service], running_message: str) -> None:
+    """Build a service from config.yaml, connect and start it, then block until SIGTERM/SIGINT.
+
+    Args:
+        factory: Callable creating the service from the loaded config (e.g. MqttBridge)
+        running_message: Logged once the service has been started
+    """
+    config = load_config()
+    log_listener = setup_logging(config.logging.level)
+    logger = logging.getLogger(__name__)
+
+    # However the process ends, stop the listener so records queued just before the exit are written
+    try:
+        service = factory(config)
+
+        def shutdown(signum, frame):
+            sig_name = signal.Signals(signum).name
+            logger.info("Received %s, shutting down", sig_name)
+            service.stop()
+            sys.exit(0)
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        service.connect()
+        service.start()
+        logger.info(running_message)
+
+        # Block main thread; MQTT loops run in background threads
+        signal.pause()
+    except Exception:
+        logger.exception("Service failed")
+        raise
+    finally:
+        log_listener.stop()
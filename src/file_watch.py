@@ -0,0 +1,119 @@
+"""Blocking change notification for a single file.
+
+On Linux the file's directory is watched with inotify and the waiting thread sleeps in select()
+until the kernel reports an event for the file or close() is called, so an idle file costs no
+wake-ups at all. Where inotify is not available (non-Linux development machines) wait() falls
+back to returning every POLL_INTERVAL seconds and the caller compares the file's stat signature.
+"""
+
+import ctypes
+import logging
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5.0
+
+# From <sys/inotify.h>
+_IN_ATTRIB = 0x00000004       # touch, chmod, cp -p restoring an older mtime
+_IN_CLOSE_WRITE = 0x00000008  # in-place edit finished
+_IN_MOVED_TO = 0x00000080     # editor's atomic replace (write temp file, rename over)
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000   # events were dropped; treat as a possible change
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len; followed by len bytes of NUL-padded name
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+except (OSError, AttributeError):  # not Linux
+    _inotify_init1 = _inotify_add_watch = None
+
+
+class FileWatch:
+    """Wait for changes to one file until close() is called.
+
+    wait() must only be called from one thread; close() may be called from any thread.
+    Use as a context manager so the inotify and wake-up descriptors are released by the waiting thread.
+    """
+
+    def __init__(self, path: Path):
+        self._name = os.fsencode(path.name)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()  # guards the descriptors against close() racing __exit__
+        self._inotify_fd: int | None = None
+        self._wake_r: int | None = None
+        self._wake_w: int | None = None
+        if _inotify_init1 is None:
+            logger.info("inotify not available, checking %s every %.0fs", path, POLL_INTERVAL)
+            return
+        fd = _inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            logger.warning("inotify_init1 failed (%s), checking %s every %.0fs",
+                           os.strerror(ctypes.get_errno()), path, POLL_INTERVAL)
+            return
+        if _inotify_add_watch(fd, os.fsencode(path.parent), _WATCH_MASK) < 0:
+            logger.warning("Cannot watch %s (%s), checking %s every %.0fs",
+                           path.parent, os.strerror(ctypes.get_errno()), path, POLL_INTERVAL)
+            os.close(fd)
+            return
+        self._inotify_fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+
+    def __enter__(self) -> "FileWatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self._lock:
+            for fd in (self._inotify_fd, self._wake_r, self._wake_w):
+                if fd is not None:
+                    os.close(fd)
+            self._inotify_fd = self._wake_r = self._wake_w = None
+
+    @property
+    def blocking(self) -> bool:
+        """True if wait() blocks until a real change; False if it falls back to polling."""
+        return self._inotify_fd is not None
+
+    def wait(self) -> bool:
+        """Block until the file may have changed (True) or close() was called (False)."""
+        if self._inotify_fd is None:
+            return not self._closed.wait(POLL_INTERVAL)
+        while not self._closed.is_set():
+            readable, _, _ = select.select([self._inotify_fd, self._wake_r], [], [])
+            if self._wake_r in readable:
+                return False
+            if self._read_events():
+                return True
+        return False
+
+    def _read_events(self) -> bool:
+        """Drain pending inotify events; return True if any concerns the watched file."""
+        changed = False
+        try:
+            data = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & _IN_Q_OVERFLOW or name == self._name:
+                changed = True
+        return changed
+
+    def close(self) -> None:
+        """Make the current or next wait() return False."""
+        self._closed.set()
+        with self._lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"\0")
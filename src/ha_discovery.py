@@ -12,9 +12,10 @@ State topics (existing):
   kpm33b/<meter_id>/minutes  -> active_energy (kWh)
 """
 
-import json
 import logging
+from types import MappingProxyType
 
+import orjson
 import paho.mqtt.client as mqtt
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,27 @@ DISCOVERY_PREFIX = "homeassistant"
 MANUFACTURER = "compere-power.com"
 MODEL = "KPM33B"
 
+# Fields that are the same for every meter; the payload builders only add the per-meter ones
+_POWER_STATIC = MappingProxyType({
+    "name": "Active Power",
+    "device_class": "power",
+    "state_class": "measurement",
+    "unit_of_measurement": "kW",
+    "value_template": "{{ value_json.active_power }}",
+    "suggested_display_precision": 0,
+})
+_ENERGY_STATIC = MappingProxyType({
+    "name": "Active Energy",
+    "device_class": "energy",
+    "state_class": "total_increasing",
+    "unit_of_measurement": "kWh",
+    "value_template": "{{ value_json.active_energy }}",
+    "suggested_display_precision": 0,
+})
+
+# Serialized (topic, payload) pairs for the power and energy sensors, keyed by the publish_discovery arguments
+_DISCOVERY_CACHE: dict[tuple[str, str, str | None, int, int], tuple[tuple[str, bytes], tuple[str, bytes]]] = {}
+
 
 def _device_block(meter_id: str, friendly_name: str | None = None) -> dict:
     """Generate the shared device block for a meter.
@@ -40,11 +62,18 @@ def _device_block(meter_id: str, friendly_name: str | None = None) -> dict:
     }
 
 
+def _state_topic(base_topic: str, meter_id: str, context: str | None, leaf: str) -> str:
+    """Build the data topic a sensor reads from: <base_topic>[/<context>]/<meter_id>/<leaf>."""
+    context_part = f"/{context}" if context else ""
+    return f"{base_topic}{context_part}/{meter_id}/{leaf}"
+
+
 def make_power_discovery_payload(
     meter_id: str,
     base_topic: str,
     context: str | None = None,
     upload_frequency: int = 30,
+    device: dict | None = None,
 ) -> dict:
     """Generate HA discovery payload for the power sensor.
 
@@ -53,25 +82,16 @@ def make_power_discovery_payload(
         base_topic: The base topic for meter data (e.g., "kpm33b")
         context: Optional context for topic hierarchy and device friendly name
         upload_frequency: Upload interval in seconds (for expire_after calculation)
+        device: Prebuilt device block to share with the energy payload
 
     Returns:
         Discovery payload dict ready for JSON serialization
     """
-    if context:
-        state_topic = f"{base_topic}/{context}/{meter_id}/seconds"
-    else:
-        state_topic = f"{base_topic}/{meter_id}/seconds"
-    return {
-        "name": "Active Power",
+    return _POWER_STATIC | {
         "unique_id": f"kpm33b_{meter_id}_power",
-        "state_topic": state_topic,
-        "device_class": "power",
-        "state_class": "measurement",
-        "unit_of_measurement": "kW",
-        "value_template": "{{ value_json.active_power }}",
-        "suggested_display_precision": 0,
+        "state_topic": _state_topic(base_topic, meter_id, context, "seconds"),
         "expire_after": int(upload_frequency * 1.5),
-        "device": _device_block(meter_id, context),
+        "device": device if device is not None else _device_block(meter_id, context),
     }
 
 
@@ -80,6 +100,7 @@ def make_energy_discovery_payload(
     base_topic: str,
     context: str | None = None,
     upload_frequency: int = 1,
+    device: dict | None = None,
 ) -> dict:
     """Generate HA discovery payload for the energy sensor.
 
@@ -88,25 +109,16 @@ def make_energy_discovery_payload(
         base_topic: The base topic for meter data (e.g., "kpm33b")
         context: Optional context for topic hierarchy and device friendly name
         upload_frequency: Upload interval in minutes (for expire_after calculation)
+        device: Prebuilt device block to share with the power payload
 
     Returns:
         Discovery payload dict ready for JSON serialization
     """
-    if context:
-        state_topic = f"{base_topic}/{context}/{meter_id}/minutes"
-    else:
-        state_topic = f"{base_topic}/{meter_id}/minutes"
-    return {
-        "name": "Active Energy",
+    return _ENERGY_STATIC | {
         "unique_id": f"kpm33b_{meter_id}_energy",
-        "state_topic": state_topic,
-        "device_class": "energy",
-        "state_class": "total_increasing",
-        "unit_of_measurement": "kWh",
-        "value_template": "{{ value_json.active_energy }}",
-        "suggested_display_precision": 0,
+        "state_topic": _state_topic(base_topic, meter_id, context, "minutes"),
         "expire_after": int(upload_frequency * 60 * 1.5),
-        "device": _device_block(meter_id, context),
+        "device": device if device is not None else _device_block(meter_id, context),
     }
 
 
@@ -123,6 +135,28 @@ def discovery_topic(meter_id: str, sensor_type: str) -> str:
     return f"{DISCOVERY_PREFIX}/sensor/kpm33b_{meter_id}/{sensor_type}/config"
 
 
+def _discovery_messages(
+    meter_id: str,
+    base_topic: str,
+    context: str | None,
+    upload_freq_seconds: int,
+    upload_freq_minutes: int,
+) -> tuple[tuple[str, bytes], tuple[str, bytes]]:
+    """Return the serialized power and energy discovery messages, building them on first use."""
+    key = (meter_id, base_topic, context, upload_freq_seconds, upload_freq_minutes)
+    messages = _DISCOVERY_CACHE.get(key)
+    if messages is None:
+        device = _device_block(meter_id, context)
+        power = make_power_discovery_payload(meter_id, base_topic, context, upload_freq_seconds, device)
+        energy = make_energy_discovery_payload(meter_id, base_topic, context, upload_freq_minutes, device)
+        messages = (
+            (discovery_topic(meter_id, "power"), orjson.dumps(power)),
+            (discovery_topic(meter_id, "energy"), orjson.dumps(energy)),
+        )
+        _DISCOVERY_CACHE[key] = messages
+    return messages
+
+
 def publish_discovery(
     client: mqtt.Client,
     meter_id: str,
@@ -135,6 +169,9 @@ def publish_discovery(
 
     Publishes discovery configs for both power and energy sensors.
     Uses QoS 1 and retain=True so HA picks up the config on restart.
+    The serialized payloads are cached, so republishing for a known meter is cheap.
+    publish() only queues the messages; paho delivers them and retries QoS 1
+    messages after a reconnect, so this call never waits for the broker.
 
     Args:
         client: Connected MQTT client (to the central broker)
@@ -144,20 +181,20 @@ def publish_discovery(
         upload_freq_seconds: Upload interval for power data (seconds)
         upload_freq_minutes: Upload interval for energy data (minutes)
     """
+    (power_topic, power_payload), (energy_topic, energy_payload) = _discovery_messages(
+        meter_id, base_topic, context, upload_freq_seconds, upload_freq_minutes
+    )
+
     # Power sensor discovery
-    power_topic = discovery_topic(meter_id, "power")
-    power_payload = json.dumps(make_power_discovery_payload(meter_id, base_topic, context, upload_freq_seconds))
     result = client.publish(power_topic, power_payload, qos=1, retain=True)
     if result.rc == mqtt.MQTT_ERR_SUCCESS:
-        logger.info("Published HA discovery for %s power sensor", meter_id)
+        logger.info("Queued HA discovery for %s power sensor", meter_id)
     else:
-        logger.error("Failed to publish HA discovery for %s power: rc=%d", meter_id, result.rc)
+        logger.error("Failed to queue HA discovery for %s power: rc=%d", meter_id, result.rc)
 
     # Energy sensor discovery
-    energy_topic = discovery_topic(meter_id, "energy")
-    energy_payload = json.dumps(make_energy_discovery_payload(meter_id, base_topic, context, upload_freq_minutes))
     result = client.publish(energy_topic, energy_payload, qos=1, retain=True)
     if result.rc == mqtt.MQTT_ERR_SUCCESS:
-        logger.info("Published HA discovery for %s energy sensor", meter_id)
+        logger.info("Queued HA discovery for %s energy sensor", meter_id)
     else:
-        logger.error("Failed to publish HA discovery for %s energy: rc=%d", meter_id, result.rc)
+        logger.error("Failed to queue HA discovery for %s energy: rc=%d", meter_id, result.rc)
@@ -0,0 +1,46 @@
+"""Fixtures shared by the mosquitto-based integration tests."""
+
+import re
+import subprocess
+
+import pytest
+
+from tests.integration.mqtt_helpers import (
+    CENTRAL_PORT,
+    INTERNAL_PORT,
+    MOSQUITTO_BIN,
+    wait_for_port,
+    write_mosquitto_conf,
+)
+
+
+@pytest.fixture(scope="session")
+def brokers(tmp_path_factory):
+    """Start the internal and central mosquitto instances once for the whole session.
+
+    Tests keep apart through per-test topic namespaces (see `topic_ns`), not through fresh brokers.
+    """
+    if MOSQUITTO_BIN is None:
+        pytest.skip("mosquitto server not installed")
+    tmp_path = tmp_path_factory.mktemp("brokers")
+    internal_conf = write_mosquitto_conf(tmp_path, INTERNAL_PORT, "internal")
+    central_conf = write_mosquitto_conf(tmp_path, CENTRAL_PORT, "central")
+
+    internal_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(internal_conf)], stderr=subprocess.PIPE)
+    central_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(central_conf)], stderr=subprocess.PIPE)
+
+    wait_for_port(internal_proc, INTERNAL_PORT, "internal")
+    wait_for_port(central_proc, CENTRAL_PORT, "central")
+
+    yield
+
+    internal_proc.terminate()
+    central_proc.terminate()
+    internal_proc.wait(timeout=5)
+    central_proc.wait(timeout=5)
+
+
+@pytest.fixture
+def topic_ns(request) -> str:
+    """Central main topic unique to the running test, e.g. "kpm33b_test_rt_data_forwarded"."""
+    return "kpm33b_" + re.sub(r"[^A-Za-z0-9_]", "_", request.node.name)
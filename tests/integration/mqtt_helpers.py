@@ -0,0 +1,79 @@
+"""Shared helpers for the mosquitto-based integration tests.
+
+The broker pair itself is started once per session by the `brokers` fixture in conftest.py.
+"""
+
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import paho.mqtt.client as mqtt
+import pytest
+
+MOSQUITTO_BIN = shutil.which("mosquitto") or shutil.which("mosquitto", path="/usr/sbin:/usr/local/sbin")
+
+INTERNAL_PORT = 18830
+CENTRAL_PORT = 18831
+
+
+def write_mosquitto_conf(tmp_path: Path, port: int, name: str) -> Path:
+    conf = tmp_path / f"{name}.conf"
+    conf.write_text(f"listener {port}\nprotocol mqtt\nallow_anonymous true\npersistence false\n")
+    return conf
+
+
+def wait_for_port(proc: subprocess.Popen, port: int, label: str, timeout: float = 2.0) -> None:
+    """Poll until the broker accepts TCP connections instead of sleeping a fixed time."""
+    deadline = time.monotonic() + timeout
+    while True:
+        if proc.poll() is not None:
+            pytest.fail(f"{label} mosquitto failed to start: {proc.stderr.read().decode()}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                pytest.fail(f"{label} mosquitto not accepting connections on port {port} after {timeout}s")
+            time.sleep(0.01)
+
+
+def connect_and_wait(client: mqtt.Client, port: int, timeout: float = 5.0) -> None:
+    """Connect a helper client, start its loop and block until CONNACK."""
+    connected = threading.Event()
+    client.on_connect = lambda client, userdata, flags, rc: connected.set()
+    client.connect("127.0.0.1", port)
+    client.loop_start()
+    assert connected.wait(timeout), f"No CONNACK from broker on port {port}"
+
+
+def expect_subacks(client: mqtt.Client, count: int) -> threading.Event:
+    """Return an event that is set once `client` has received `count` SUBACKs.
+
+    Install before the client subscribes (for the bridge/sender: before connect()).
+    """
+    done = threading.Event()
+    remaining = [count]
+
+    def on_subscribe(client, userdata, mid, granted_qos, properties=None):
+        remaining[0] -= 1
+        if remaining[0] <= 0:
+            done.set()
+
+    client.on_subscribe = on_subscribe
+    return done
+
+
+def wait_connected(client: mqtt.Client, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not client.is_connected():
+        assert time.monotonic() < deadline, "client did not connect"
+        time.sleep(0.01)
+
+
+def clear_retained(client: mqtt.Client, topics: list[str]) -> None:
+    """Delete retained messages so they do not leak into later tests on the shared brokers."""
+    for topic in topics:
+        client.publish(topic, b"", qos=1, retain=True).wait_for_publish(timeout=5)
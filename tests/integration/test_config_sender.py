@@ -1,6 +1,6 @@
 """Integration test: ConfigSender sets meter upload frequency via local mosquitto brokers.
 
-Starts two ephemeral mosquitto instances (internal + central), then verifies that
+Uses the session's two mosquitto instances (internal + central) and verifies that
 ConfigSender discovers a meter and sends the correct configuration commands.
 
 Requires `mosquitto` server binary to be installed.
@@ -8,29 +8,30 @@ Skips automatically if unavailable.
 """
 
 import json
-import shutil
-import subprocess
 import threading
 import time
-from pathlib import Path
 
 import paho.mqtt.client as mqtt
 import pytest
 
 from src.config import AppConfig
 from src.config_sender import ConfigSender
+from tests.integration.mqtt_helpers import (
+    CENTRAL_PORT,
+    INTERNAL_PORT,
+    MOSQUITTO_BIN,
+    connect_and_wait,
+    expect_subacks,
+)
 
-MOSQUITTO_BIN = shutil.which("mosquitto") or shutil.which("mosquitto", path="/usr/sbin:/usr/local/sbin")
 pytestmark = pytest.mark.skipif(MOSQUITTO_BIN is None, reason="mosquitto server not installed")
 
-INTERNAL_PORT = 18832
-CENTRAL_PORT = 18833
 METER_ID = "33B1225950028"
 METER_LAST8 = "25950028"
 
 
 @pytest.fixture
-def config(tmp_path):
+def config(topic_ns):
     """AppConfig with upload_frequency_seconds=30 and upload_frequency_minutes=1."""
     cfg = {
         "internal_broker": {"host": "127.0.0.1", "port": INTERNAL_PORT},
@@ -42,8 +43,8 @@ def config(tmp_path):
             "meter_settime_ack": "MQTT_COMMOD_SET_REP",
         },
         "central_broker_topics": {
-            "external_main_topic": "kpm33b",
-            "status_topic": "kpm33b/status",
+            "external_main_topic": topic_ns,
+            "status_topic": f"{topic_ns}/status",
         },
         "logging": {"level": "DEBUG"},
         "kpm33b_meters": {"upload_frequency_seconds": 30, "upload_frequency_minutes": 1},
@@ -51,44 +52,48 @@ def config(tmp_path):
     return AppConfig(**cfg)
 
 
-def _write_mosquitto_conf(tmp_path: Path, port: int, name: str) -> Path:
-    conf = tmp_path / f"{name}.conf"
-    conf.write_text(f"listener {port}\nprotocol mqtt\nallow_anonymous true\npersistence false\n")
-    return conf
+@pytest.fixture(scope="module")
+def meter_client(brokers):
+    """Internal broker client playing the meter, connected once for all tests."""
+    client = mqtt.Client(client_id="test_meter", protocol=mqtt.MQTTv311)
+    connect_and_wait(client, INTERNAL_PORT)
+    yield client
+    client.loop_stop()
+    client.disconnect()
 
 
-@pytest.fixture
-def brokers(tmp_path):
-    """Start two local mosquitto instances and tear them down after the test."""
-    internal_conf = _write_mosquitto_conf(tmp_path, INTERNAL_PORT, "internal")
-    central_conf = _write_mosquitto_conf(tmp_path, CENTRAL_PORT, "central")
-
-    internal_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(internal_conf)], stderr=subprocess.PIPE)
-    central_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(central_conf)], stderr=subprocess.PIPE)
+@pytest.fixture(scope="module")
+def discovery_pub(brokers):
+    """Central broker client used to publish discovery messages."""
+    client = mqtt.Client(client_id="test_discovery_pub", protocol=mqtt.MQTTv311)
+    connect_and_wait(client, CENTRAL_PORT)
+    yield client
+    client.loop_stop()
+    client.disconnect()
 
-    time.sleep(1)
 
-    for proc, label in [(internal_proc, "internal"), (central_proc, "central")]:
-        if proc.poll() is not None:
-            pytest.fail(f"{label} mosquitto failed to start: {proc.stderr.read().decode()}")
+def _start_sender(sender: ConfigSender) -> None:
+    """Connect and start the sender, blocking until both of its subscriptions are acked."""
+    central_subscribed = expect_subacks(sender.central_client, 1)
+    internal_subscribed = expect_subacks(sender.internal_client, 1)
+    sender.connect()
+    sender.start()
+    assert central_subscribed.wait(timeout=5) and internal_subscribed.wait(timeout=5), "config sender did not subscribe"
 
-    yield
 
-    internal_proc.terminate()
-    central_proc.terminate()
-    internal_proc.wait(timeout=5)
-    central_proc.wait(timeout=5)
+def _publish_discovery(discovery_pub: mqtt.Client, topic_ns: str) -> None:
+    """Publish a seconds message on the central broker to trigger meter detection."""
+    discovery_msg = json.dumps({"id": METER_ID, "time": "20260204120000", "active_power": 1.5})
+    discovery_pub.publish(f"{topic_ns}/{METER_ID}/seconds", discovery_msg, qos=1)
 
 
 class TestConfigSenderEndToEnd:
     """ConfigSender discovers a meter and sends upload frequency configuration."""
 
-    def test_config_commands_published(self, config, brokers):
+    def test_config_commands_published(self, config, meter_client, discovery_pub, topic_ns):
         """Trigger meter discovery, verify two config commands arrive on the correct topic."""
         sender = ConfigSender(config)
-        sender.connect()
-        sender.start()
-        time.sleep(0.5)
+        _start_sender(sender)
 
         # Subscribe to the config topic on the internal broker (as the meter would)
         config_topic = f"MQTT_COMMOD_SET_{METER_LAST8}"
@@ -100,24 +105,17 @@ class TestConfigSenderEndToEnd:
             if len(received) >= 2:
                 all_received.set()
 
-        meter_sub = mqtt.Client(client_id="test_meter_sub", protocol=mqtt.MQTTv311)
-        meter_sub.on_message = on_message
-        meter_sub.connect("127.0.0.1", INTERNAL_PORT)
-        meter_sub.subscribe(config_topic, qos=1)
-        meter_sub.loop_start()
-        time.sleep(0.5)
+        meter_client.message_callback_add(config_topic, on_message)
+        subscribed = expect_subacks(meter_client, 1)
+        meter_client.subscribe(config_topic, qos=1)
+        assert subscribed.wait(timeout=5)
 
-        # Publish a discovery message on central broker to trigger meter detection
-        discovery_pub = mqtt.Client(client_id="test_discovery_pub", protocol=mqtt.MQTTv311)
-        discovery_pub.connect("127.0.0.1", CENTRAL_PORT)
-        discovery_msg = json.dumps({"id": METER_ID, "time": "20260204120000", "active_power": 1.5})
-        discovery_pub.publish(f"kpm33b/{METER_ID}/seconds", discovery_msg, qos=1)
-        discovery_pub.disconnect()
+        _publish_discovery(discovery_pub, topic_ns)
 
         all_received.wait(timeout=10)
         sender.stop()
-        meter_sub.loop_stop()
-        meter_sub.disconnect()
+        meter_client.unsubscribe(config_topic)
+        meter_client.message_callback_remove(config_topic)
 
         assert len(received) == 2, f"Expected 2 config commands, got {len(received)}"
 
@@ -136,15 +134,13 @@ class TestConfigSenderEndToEnd:
         assert minutes_cmd["types"] == "1"
         assert len(minutes_cmd["oprid"]) == 32
 
-    def test_ack_received_no_alert(self, config, brokers, caplog):
+    def test_ack_received_no_alert(self, config, meter_client, discovery_pub, topic_ns, caplog):
         """Send ACKs for both commands, verify no CRITICAL alert is logged."""
         import logging
         caplog.set_level(logging.DEBUG)
 
         sender = ConfigSender(config)
-        sender.connect()
-        sender.start()
-        time.sleep(0.5)
+        _start_sender(sender)
 
         # Subscribe to config topic and reply with ACKs
         config_topic = f"MQTT_COMMOD_SET_{METER_LAST8}"
@@ -162,27 +158,20 @@ class TestConfigSenderEndToEnd:
             if len(received_oprids) >= 2:
                 all_received.set()
 
-        meter_sim = mqtt.Client(client_id="test_meter_sim", protocol=mqtt.MQTTv311)
-        meter_sim.on_message = on_config_msg
-        meter_sim.connect("127.0.0.1", INTERNAL_PORT)
-        meter_sim.subscribe(config_topic, qos=1)
-        meter_sim.loop_start()
-        time.sleep(0.5)
+        meter_client.message_callback_add(config_topic, on_config_msg)
+        subscribed = expect_subacks(meter_client, 1)
+        meter_client.subscribe(config_topic, qos=1)
+        assert subscribed.wait(timeout=5)
 
-        # Trigger meter discovery
-        discovery_pub = mqtt.Client(client_id="test_discovery_pub2", protocol=mqtt.MQTTv311)
-        discovery_pub.connect("127.0.0.1", CENTRAL_PORT)
-        discovery_msg = json.dumps({"id": METER_ID, "time": "20260204120000", "active_power": 1.5})
-        discovery_pub.publish(f"kpm33b/{METER_ID}/seconds", discovery_msg, qos=1)
-        discovery_pub.disconnect()
+        _publish_discovery(discovery_pub, topic_ns)
 
         all_received.wait(timeout=10)
         # Give time for ACK processing
         time.sleep(1)
 
         sender.stop()
-        meter_sim.loop_stop()
-        meter_sim.disconnect()
+        meter_client.unsubscribe(config_topic)
+        meter_client.message_callback_remove(config_topic)
 
         assert len(received_oprids) == 2
         # Verify no CRITICAL/ALERT log about missing acks
@@ -5,9 +5,7 @@ Skips automatically if unavailable.
 """
 
 import json
-import shutil
-import subprocess
-import time
+import threading
 from pathlib import Path
 
 import paho.mqtt.client as mqtt
@@ -15,18 +13,29 @@ import pytest
 
 from src.bridge import MqttBridge
 from src.config import AppConfig
+from src.ha_discovery import discovery_topic
+from tests.integration.mqtt_helpers import (
+    CENTRAL_PORT,
+    INTERNAL_PORT,
+    MOSQUITTO_BIN,
+    clear_retained,
+    connect_and_wait,
+    expect_subacks,
+    wait_connected,
+)
 
-MOSQUITTO_BIN = shutil.which("mosquitto") or shutil.which("mosquitto", path="/usr/sbin:/usr/local/sbin")
 pytestmark = pytest.mark.skipif(MOSQUITTO_BIN is None, reason="mosquitto server not installed")
 
-INTERNAL_PORT = 18830
-CENTRAL_PORT = 18831
 TEST_MSG_DIR = Path(__file__).resolve().parent.parent / "test_msg"
+METER_ID = "33B1225950027"
+# Fixture messages, read once per module and published as-is
+RT_DATA_PAYLOAD = (TEST_MSG_DIR / "MQTT_RT_DATA.json").read_bytes()
+ENY_NOW_PAYLOAD = (TEST_MSG_DIR / "MQTT_ENY_NOW.json").read_bytes()
 
 
 @pytest.fixture
-def config(tmp_path):
-    """AppConfig pointing to ephemeral local broker ports."""
+def config(topic_ns):
+    """AppConfig pointing to the session brokers, with a central main topic unique to the test."""
     cfg = {
         "internal_broker": {"host": "127.0.0.1", "port": INTERNAL_PORT},
         "central_broker": {"host": "127.0.0.1", "port": CENTRAL_PORT},
@@ -37,8 +46,8 @@ def config(tmp_path):
             "meter_settime_ack": "MQTT_COMMOD_SET_REP",
         },
         "central_broker_topics": {
-            "external_main_topic": "kpm33b",
-            "status_topic": "kpm33b/status",
+            "external_main_topic": topic_ns,
+            "status_topic": f"{topic_ns}/status",
         },
         "logging": {"level": "DEBUG"},
         "kpm33b_meters": {"upload_frequency_seconds": 5, "upload_frequency_minutes": 1},
@@ -46,108 +55,79 @@ def config(tmp_path):
     return AppConfig(**cfg)
 
 
-def _write_mosquitto_conf(tmp_path: Path, port: int, name: str) -> Path:
-    conf = tmp_path / f"{name}.conf"
-    conf.write_text(f"listener {port}\nprotocol mqtt\nallow_anonymous true\npersistence false\n")
-    return conf
+@pytest.fixture(scope="module")
+def subscriber(brokers):
+    """Central broker client, connected once; tests attach a topic callback and subscribe."""
+    client = mqtt.Client(client_id="test_subscriber", protocol=mqtt.MQTTv311)
+    connect_and_wait(client, CENTRAL_PORT)
+    yield client
+    client.loop_stop()
+    client.disconnect()
 
 
-@pytest.fixture
-def brokers(tmp_path):
-    """Start two local mosquitto instances and tear them down after the test."""
-    internal_conf = _write_mosquitto_conf(tmp_path, INTERNAL_PORT, "internal")
-    central_conf = _write_mosquitto_conf(tmp_path, CENTRAL_PORT, "central")
-
-    internal_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(internal_conf)], stderr=subprocess.PIPE)
-    central_proc = subprocess.Popen([MOSQUITTO_BIN, "-c", str(central_conf)], stderr=subprocess.PIPE)
-
-    time.sleep(1)  # wait for brokers to start
-
-    for proc, label in [(internal_proc, "internal"), (central_proc, "central")]:
-        if proc.poll() is not None:
-            pytest.fail(f"{label} mosquitto failed to start: {proc.stderr.read().decode()}")
-
-    yield
-
-    internal_proc.terminate()
-    central_proc.terminate()
-    internal_proc.wait(timeout=5)
-    central_proc.wait(timeout=5)
+@pytest.fixture(scope="module")
+def publisher(brokers):
+    """Internal broker client playing the meter, connected once for all tests."""
+    client = mqtt.Client(client_id="test_publisher", protocol=mqtt.MQTTv311)
+    connect_and_wait(client, INTERNAL_PORT)
+    yield client
+    client.loop_stop()
+    client.disconnect()
 
 
 class TestDataFlowEndToEnd:
-    def test_rt_data_forwarded(self, config, brokers):
-        """Publish MQTT_RT_DATA to internal broker, verify transformed output on central broker."""
+    def _forward(self, config, subscriber, publisher, in_topic: str, payload: bytes, out_filter: str) -> list:
+        """Run a bridge, publish one fixture message on the internal broker and collect central output."""
         bridge = MqttBridge(config)
+        bridge_subscribed = expect_subacks(bridge.internal_client, 2)  # seconds + minutes topics
         bridge.connect()
         bridge.start()
-        time.sleep(0.5)
+        assert bridge_subscribed.wait(timeout=5), "bridge did not subscribe on the internal broker"
+        wait_connected(bridge.central_client)
 
         received = []
-        done = __import__("threading").Event()
+        done = threading.Event()
 
         def on_message(client, userdata, msg):
             received.append((msg.topic, json.loads(msg.payload)))
             done.set()
 
-        subscriber = mqtt.Client(client_id="test_subscriber", protocol=mqtt.MQTTv311)
-        subscriber.on_message = on_message
-        subscriber.connect("127.0.0.1", CENTRAL_PORT)
-        subscriber.subscribe("kpm33b/+/seconds")
-        subscriber.loop_start()
-        time.sleep(0.5)
-
-        raw = json.loads((TEST_MSG_DIR / "MQTT_RT_DATA.json").read_text())
-        publisher = mqtt.Client(client_id="test_publisher", protocol=mqtt.MQTTv311)
-        publisher.connect("127.0.0.1", INTERNAL_PORT)
-        publisher.publish("MQTT_RT_DATA", json.dumps(raw), qos=1)
-        publisher.disconnect()
-
-        done.wait(timeout=5)
-        bridge.stop()
-        subscriber.loop_stop()
-        subscriber.disconnect()
+        subscriber.message_callback_add(out_filter, on_message)
+        subscribed = expect_subacks(subscriber, 1)
+        subscriber.subscribe(out_filter)
+        assert subscribed.wait(timeout=5)
+
+        try:
+            publisher.publish(in_topic, payload, qos=1)
+            done.wait(timeout=5)
+        finally:
+            bridge.stop()
+            subscriber.unsubscribe(out_filter)
+            subscriber.message_callback_remove(out_filter)
+            # The bridge publishes retained HA discovery configs; drop them for the next test
+            clear_retained(subscriber, [discovery_topic(METER_ID, "power"), discovery_topic(METER_ID, "energy")])
+        return received
+
+    def test_rt_data_forwarded(self, config, subscriber, publisher, topic_ns):
+        """Publish MQTT_RT_DATA to internal broker, verify transformed output on central broker."""
+        received = self._forward(
+            config, subscriber, publisher, "MQTT_RT_DATA", RT_DATA_PAYLOAD, f"{topic_ns}/+/seconds"
+        )
 
         assert len(received) == 1
         topic, payload = received[0]
-        assert topic == "kpm33b/33B1225950027/seconds"
+        assert topic == f"{topic_ns}/{METER_ID}/seconds"
         assert payload["active_power"] == 6.6905
-        assert payload["id"] == "33B1225950027"
+        assert payload["id"] == METER_ID
 
-    def test_eny_now_forwarded(self, config, brokers):
+    def test_eny_now_forwarded(self, config, subscriber, publisher, topic_ns):
         """Publish MQTT_ENY_NOW to internal broker, verify transformed output on central broker."""
-        bridge = MqttBridge(config)
-        bridge.connect()
-        bridge.start()
-        time.sleep(0.5)
-
-        received = []
-        done = __import__("threading").Event()
-
-        def on_message(client, userdata, msg):
-            received.append((msg.topic, json.loads(msg.payload)))
-            done.set()
-
-        subscriber = mqtt.Client(client_id="test_subscriber", protocol=mqtt.MQTTv311)
-        subscriber.on_message = on_message
-        subscriber.connect("127.0.0.1", CENTRAL_PORT)
-        subscriber.subscribe("kpm33b/+/minutes")
-        subscriber.loop_start()
-        time.sleep(0.5)
-
-        raw = json.loads((TEST_MSG_DIR / "MQTT_ENY_NOW.json").read_text())
-        publisher = mqtt.Client(client_id="test_publisher", protocol=mqtt.MQTTv311)
-        publisher.connect("127.0.0.1", INTERNAL_PORT)
-        publisher.publish("MQTT_ENY_NOW", json.dumps(raw), qos=1)
-        publisher.disconnect()
-
-        done.wait(timeout=5)
-        bridge.stop()
-        subscriber.loop_stop()
-        subscriber.disconnect()
+        received = self._forward(
+            config, subscriber, publisher, "MQTT_ENY_NOW", ENY_NOW_PAYLOAD, f"{topic_ns}/+/minutes"
+        )
 
         assert len(received) == 1
         topic, payload = received[0]
-        assert topic == "kpm33b/33B1225950027/minutes"
+        assert topic == f"{topic_ns}/{METER_ID}/minutes"
         assert payload["active_energy"] == 163.486
-        assert payload["id"] == "33B1225950027"
+        assert payload["id"] == METER_ID
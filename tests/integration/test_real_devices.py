@@ -15,6 +15,7 @@ Observation window: 5 minutes (RT_DATA defaults to 30s, ENY_NOW to 1 min).
 import json
 import logging
 import os
+import queue
 import threading
 import time
 
@@ -24,6 +25,7 @@ import pytest
 from src.bridge import MqttBridge
 from src.config import AppConfig
 from src.config_sender import ConfigSender
+from tests.integration.mqtt_helpers import expect_subacks, wait_connected
 
 BROKER_HOST = "10.4.4.17"
 BROKER_PORT = 1883
@@ -35,8 +37,8 @@ TIMEOUT_MINUTES_DATA = 28800  # 8 hours — ENY_NOW interval may be long
 pytestmark = pytest.mark.skipif(MQTT_PASS is None, reason="MQTTPW env var not set")
 
 
-@pytest.fixture
-def config(tmp_path):
+@pytest.fixture(scope="module")
+def config():
     broker_cfg = {"host": BROKER_HOST, "port": BROKER_PORT, "username": MQTT_USER, "password": MQTT_PASS}
     return AppConfig(
         internal_broker=broker_cfg,
@@ -56,32 +58,45 @@ def config(tmp_path):
     )
 
 
+@pytest.fixture(scope="module")
+def observer():
+    """Client on the shared broker, connected once; tests attach topic callbacks and subscribe."""
+    client = mqtt.Client(client_id="test_real_observer", protocol=mqtt.MQTTv311)
+    client.username_pw_set(MQTT_USER, MQTT_PASS)
+    client.connect(BROKER_HOST, BROKER_PORT)
+    client.loop_start()
+    yield client
+    client.loop_stop()
+    client.disconnect()
+
+
+@pytest.fixture(scope="class")
+def bridge(config):
+    """Bridge shared by the data-flow tests, returned once it is subscribed and connected to both brokers."""
+    bridge = MqttBridge(config)
+    subscribed = expect_subacks(bridge.internal_client, 2)  # seconds + minutes topics
+    bridge.connect()
+    bridge.start()
+    assert subscribed.wait(timeout=10), "bridge did not subscribe on the internal broker"
+    wait_connected(bridge.central_client, timeout=10)
+    yield bridge
+    bridge.stop()
+
+
+@pytest.mark.usefixtures("bridge")
 class TestRealDeviceDataFlow:
-    def test_rt_data_from_real_device(self, config):
+    def test_rt_data_from_real_device(self, observer):
         """Wait for a real MQTT_RT_DATA message, verify bridge transforms and publishes it."""
-        bridge = MqttBridge(config)
-        bridge.connect()
-        bridge.start()
-        time.sleep(1)
-
-        received = []
-        done = threading.Event()
-
-        def on_message(client, userdata, msg):
-            received.append((msg.topic, json.loads(msg.payload)))
-            done.set()
-
-        subscriber = mqtt.Client(client_id="test_real_sub_seconds", protocol=mqtt.MQTTv311)
-        subscriber.username_pw_set(MQTT_USER, MQTT_PASS)
-        subscriber.on_message = on_message
-        subscriber.connect(BROKER_HOST, BROKER_PORT)
-        subscriber.subscribe("kpm33b/+/seconds")
-        subscriber.loop_start()
+        received = queue.SimpleQueue()
+        observer.message_callback_add("kpm33b/+/seconds", lambda client, userdata, msg: received.put(msg))
+        observer.subscribe("kpm33b/+/seconds")
 
         try:
-            assert done.wait(timeout=TIMEOUT_SECONDS_DATA), \
-                f"No MQTT_RT_DATA message received from real devices within {TIMEOUT_SECONDS_DATA}s"
-            topic, payload = received[0]
+            try:
+                msg = received.get(timeout=TIMEOUT_SECONDS_DATA)
+            except queue.Empty:
+                pytest.fail(f"No MQTT_RT_DATA message received from real devices within {TIMEOUT_SECONDS_DATA}s")
+            topic, payload = msg.topic, json.loads(msg.payload)
             assert topic.startswith("kpm33b/")
             assert topic.endswith("/seconds")
             assert "id" in payload
@@ -89,35 +104,21 @@ class TestRealDeviceDataFlow:
             assert "active_power" in payload
             assert len(payload["id"]) == 13
         finally:
-            bridge.stop()
-            subscriber.loop_stop()
-            subscriber.disconnect()
+            observer.unsubscribe("kpm33b/+/seconds")
+            observer.message_callback_remove("kpm33b/+/seconds")
 
-    def test_eny_now_from_real_device(self, config):
+    def test_eny_now_from_real_device(self, observer):
         """Wait for a real MQTT_ENY_NOW message, verify bridge transforms and publishes it."""
-        bridge = MqttBridge(config)
-        bridge.connect()
-        bridge.start()
-        time.sleep(1)
-
-        received = []
-        done = threading.Event()
-
-        def on_message(client, userdata, msg):
-            received.append((msg.topic, json.loads(msg.payload)))
-            done.set()
-
-        subscriber = mqtt.Client(client_id="test_real_sub_minutes", protocol=mqtt.MQTTv311)
-        subscriber.username_pw_set(MQTT_USER, MQTT_PASS)
-        subscriber.on_message = on_message
-        subscriber.connect(BROKER_HOST, BROKER_PORT)
-        subscriber.subscribe("kpm33b/+/minutes")
-        subscriber.loop_start()
+        received = queue.SimpleQueue()
+        observer.message_callback_add("kpm33b/+/minutes", lambda client, userdata, msg: received.put(msg))
+        observer.subscribe("kpm33b/+/minutes")
 
         try:
-            assert done.wait(timeout=TIMEOUT_MINUTES_DATA), \
-                f"No MQTT_ENY_NOW message received from real devices within {TIMEOUT_MINUTES_DATA}s"
-            topic, payload = received[0]
+            try:
+                msg = received.get(timeout=TIMEOUT_MINUTES_DATA)
+            except queue.Empty:
+                pytest.fail(f"No MQTT_ENY_NOW message received from real devices within {TIMEOUT_MINUTES_DATA}s")
+            topic, payload = msg.topic, json.loads(msg.payload)
             assert topic.startswith("kpm33b/")
             assert topic.endswith("/minutes")
             assert "id" in payload
@@ -125,9 +126,8 @@ class TestRealDeviceDataFlow:
             assert "active_energy" in payload
             assert len(payload["id"]) == 13
         finally:
-            bridge.stop()
-            subscriber.loop_stop()
-            subscriber.disconnect()
+            observer.unsubscribe("kpm33b/+/minutes")
+            observer.message_callback_remove("kpm33b/+/minutes")
 
 
 METER_ID = "33B1225950028"
@@ -138,22 +138,24 @@ TIMEOUT_CONFIG = 30  # seconds — generous timeout for broker round-trip
 class TestRealDeviceConfigSender:
     """Send upload frequency config to a real meter via MQTT_COMMOD_SET_<last8>."""
 
-    def test_config_sender_sets_intervals(self, config, caplog):
+    def test_config_sender_sets_intervals(self, config, observer, caplog):
         """Discover meter, send 30s/1min config, verify commands published and meter ACKs."""
         caplog.set_level(logging.DEBUG)
 
         sender = ConfigSender(config)
+        central_subscribed = expect_subacks(sender.central_client, 1)
+        internal_subscribed = expect_subacks(sender.internal_client, 1)
         sender.connect()
         sender.start()
-        time.sleep(1)
+        assert central_subscribed.wait(timeout=10) and internal_subscribed.wait(timeout=10), \
+            "config sender did not subscribe"
 
         config_topic = f"MQTT_COMMOD_SET_{METER_LAST8}"
         ack_topic = "MQTT_COMMOD_SET_REP"
         commands_received = []
         commands_done = threading.Event()
-        # Track ACKs keyed by oprid so we can match against sent commands
-        ack_oprids: set[str] = set()
-        ack_lock = threading.Lock()
+        # One Event per oprid, created by whichever side sees the oprid first (dict.setdefault is atomic)
+        ack_events: dict[str, threading.Event] = {}
 
         def on_config_msg(client, userdata, msg):
             commands_received.append(json.loads(msg.payload))
@@ -164,33 +166,18 @@ class TestRealDeviceConfigSender:
             payload = json.loads(msg.payload)
             oprid = payload.get("oprid")
             if oprid:
-                with ack_lock:
-                    ack_oprids.add(oprid)
-
-        # Observer for config commands on internal broker
-        cmd_observer = mqtt.Client(client_id="test_cmd_observer", protocol=mqtt.MQTTv311)
-        cmd_observer.username_pw_set(MQTT_USER, MQTT_PASS)
-        cmd_observer.on_message = on_config_msg
-        cmd_observer.connect(BROKER_HOST, BROKER_PORT)
-        cmd_observer.subscribe(config_topic, qos=1)
-        cmd_observer.loop_start()
-
-        # Observer for ACK messages from real meter
-        ack_observer = mqtt.Client(client_id="test_ack_observer", protocol=mqtt.MQTTv311)
-        ack_observer.username_pw_set(MQTT_USER, MQTT_PASS)
-        ack_observer.on_message = on_ack_msg
-        ack_observer.connect(BROKER_HOST, BROKER_PORT)
-        ack_observer.subscribe(ack_topic, qos=1)
-        ack_observer.loop_start()
-        time.sleep(0.5)
+                ack_events.setdefault(oprid, threading.Event()).set()
+
+        # Observe config commands and ACKs from the real meter on the internal broker
+        observer.message_callback_add(config_topic, on_config_msg)
+        observer.message_callback_add(ack_topic, on_ack_msg)
+        observer_subscribed = expect_subacks(observer, 1)  # one SUBACK covers both topics
+        observer.subscribe([(config_topic, 1), (ack_topic, 1)])
+        assert observer_subscribed.wait(timeout=10), "observer did not subscribe"
 
         # Trigger meter discovery
-        discovery_pub = mqtt.Client(client_id="test_discovery_trigger", protocol=mqtt.MQTTv311)
-        discovery_pub.username_pw_set(MQTT_USER, MQTT_PASS)
-        discovery_pub.connect(BROKER_HOST, BROKER_PORT)
         discovery_msg = json.dumps({"id": METER_ID, "time": "20260204120000", "active_power": 0.0})
-        discovery_pub.publish(f"kpm33b/{METER_ID}/seconds", discovery_msg, qos=1)
-        discovery_pub.disconnect()
+        observer.publish(f"kpm33b/{METER_ID}/seconds", discovery_msg, qos=1)
 
         try:
             # --- Phase 1: verify config commands were published ---
@@ -214,15 +201,10 @@ class TestRealDeviceConfigSender:
             # --- Phase 2: wait for ACKs from real meter ---
             sent_oprids = {c["oprid"] for c in commands_received}
             deadline = time.monotonic() + TIMEOUT_CONFIG
-            while time.monotonic() < deadline:
-                with ack_lock:
-                    if sent_oprids.issubset(ack_oprids):
-                        break
-                time.sleep(0.5)
-
-            with ack_lock:
-                matched = sent_oprids & ack_oprids
-                missing = sent_oprids - ack_oprids
+            missing = {
+                oprid for oprid in sent_oprids
+                if not ack_events.setdefault(oprid, threading.Event()).wait(max(0.0, deadline - time.monotonic()))
+            }
 
             assert not missing, \
                 f"Meter did not ACK all commands within {TIMEOUT_CONFIG}s. Missing oprids: {missing}"
@@ -234,7 +216,6 @@ class TestRealDeviceConfigSender:
 
         finally:
             sender.stop()
-            cmd_observer.loop_stop()
-            cmd_observer.disconnect()
-            ack_observer.loop_stop()
-            ack_observer.disconnect()
+            observer.unsubscribe([config_topic, ack_topic])
+            observer.message_callback_remove(config_topic)
+            observer.message_callback_remove(ack_topic)
@@ -1,11 +1,12 @@
 """Unit tests for src/bridge.py."""
 
 import json
+import socket
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.bridge import MqttBridge
+from src.bridge import CENTRAL_MAX_INFLIGHT, MqttBridge
 from src.config import AppConfig
 
 
@@ -101,6 +102,17 @@ def bridge_with_contexts(config_with_contexts):
     return b
 
 
+class TestClientSetup:
+    def test_central_inflight_window_raised(self, bridge):
+        bridge.central_client.max_inflight_messages_set.assert_called_once_with(CENTRAL_MAX_INFLIGHT)
+
+    def test_tcp_nodelay_set_on_socket_open(self, bridge):
+        for client in (bridge.internal_client, bridge.central_client):
+            sock = MagicMock()
+            client.on_socket_open(client, None, sock)
+            sock.setsockopt.assert_called_once_with(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
 class TestOnInternalConnect:
     def test_subscribes_to_both_topics(self, bridge):
         mock_client = MagicMock()
@@ -141,6 +153,20 @@ class TestOnInternalMessage:
         published = json.loads(data_call.args[1])
         assert published["active_power"] == 6.6905
 
+    def test_publish_qos_per_topic(self, bridge):
+        bridge.central_client.publish = MagicMock()
+        bridge.central_client.publish.return_value = MagicMock(rc=0)
+        rt = {"id": "33B1225950027", "time": "20260112163900", "zyggl": 6.6905, "isend": "1"}
+        eny = {"id": "33B1225950027", "time": "20260117211500", "zygsz": 163.486, "isend": "1"}
+
+        bridge._on_internal_message(None, None, self._make_msg("MQTT_RT_DATA", rt))
+        seconds_call = bridge.central_client.publish.call_args_list[-1]
+        bridge._on_internal_message(None, None, self._make_msg("MQTT_ENY_NOW", eny))
+        minutes_call = bridge.central_client.publish.call_args_list[-1]
+
+        assert seconds_call.kwargs["qos"] == 0
+        assert minutes_call.kwargs["qos"] == 1
+
     def test_eny_now_publishes_to_central(self, bridge):
         payload = {
             "id": "33B1225950027", "time": "20260117211500",
@@ -237,6 +263,17 @@ class TestDeviceIdExclusion:
 
         bridge_with_exclusion.central_client.publish.assert_not_called()
 
+    def test_excluded_device_dropped_before_parsing(self, bridge_with_exclusion):
+        msg = MagicMock()
+        msg.topic = "MQTT_RT_DATA"
+        msg.payload = b'{"id":"33BFAKE000000","time":"20260112163900","zyggl":6.0,"isend":"1"}'
+
+        with patch("src.bridge.orjson.loads") as mock_loads:
+            bridge_with_exclusion._on_internal_message(None, None, msg)
+
+        mock_loads.assert_not_called()
+        bridge_with_exclusion.central_client.publish.assert_not_called()
+
     def test_non_excluded_device_publishes(self, bridge_with_exclusion):
         """Messages from devices not in the exclusion list are published."""
         payload = {"id": "33B1225950027", "time": "20260112163900", "zyggl": 6.0, "isend": "1"}
@@ -295,6 +332,11 @@ class TestDeviceContext:
         prefix = bridge._build_topic_prefix("33B1225950027")
         assert prefix == "kpm33b/33B1225950027"
 
+    def test_target_topic_cached(self, bridge_with_contexts):
+        topic = bridge_with_contexts._get_target_topic("33B1225950027", "seconds")
+        assert topic == "kpm33b/building1/floor2/33B1225950027/seconds"
+        assert bridge_with_contexts._get_target_topic("33B1225950027", "seconds") is topic
+
     def test_rt_data_publishes_with_context(self, bridge_with_contexts):
         payload = {
             "id": "33B1225950027", "time": "20260112163900",
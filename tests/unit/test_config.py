@@ -1,5 +1,6 @@
 """Unit tests for src/config.py."""
 
+import os
 import textwrap
 from pathlib import Path
 
@@ -84,7 +85,7 @@ def test_exclude_device_ids_with_values(tmp_path, valid_config_dict):
     config_file = tmp_path / "config.yaml"
     config_file.write_text(yaml.dump(valid_config_dict))
     config = load_config(config_file)
-    assert config.kpm33b_meters.exclude_device_ids == ["000000000000", "FFFFFFFFFFFF"]
+    assert config.kpm33b_meters.exclude_device_ids == frozenset({"000000000000", "FFFFFFFFFFFF"})
 
 
 def test_device_contexts_optional(valid_config_dict):
@@ -132,3 +133,41 @@ def test_duplicate_dict_max_length_custom(tmp_path, valid_config_dict):
     config_file.write_text(yaml.dump(valid_config_dict))
     config = load_config(config_file)
     assert config.kpm33b_meters.duplicate_dict_max_length == 100
+
+
+def test_unchanged_file_served_from_cache(tmp_path, valid_config_dict):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.dump(valid_config_dict))
+    assert load_config(config_file) is load_config(config_file)
+
+
+def test_changed_file_reloaded(tmp_path, valid_config_dict):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.dump(valid_config_dict))
+    first = load_config(config_file)
+    valid_config_dict["kpm33b_meters"]["upload_frequency_seconds"] = 10
+    config_file.write_text(yaml.dump(valid_config_dict))
+    second = load_config(config_file)
+    assert second is not first
+    assert second.kpm33b_meters.upload_frequency_seconds == 10
+
+
+def test_replaced_file_with_same_size_and_mtime_reloaded(tmp_path, valid_config_dict):
+    """An atomic replace (new inode) is reloaded even if size and mtime_ns match the old file."""
+    config_file = tmp_path / "config.yaml"
+    valid_config_dict["kpm33b_meters"]["upload_frequency_seconds"] = 30
+    config_file.write_text(yaml.dump(valid_config_dict))
+    first = load_config(config_file)
+    old = config_file.stat()
+
+    replacement = tmp_path / "config.yaml.tmp"
+    valid_config_dict["kpm33b_meters"]["upload_frequency_seconds"] = 60
+    replacement.write_text(yaml.dump(valid_config_dict))
+    os.utime(replacement, ns=(old.st_atime_ns, old.st_mtime_ns))
+    os.replace(replacement, config_file)
+    new = config_file.stat()
+    assert (new.st_size, new.st_mtime_ns) == (old.st_size, old.st_mtime_ns)
+
+    second = load_config(config_file)
+    assert second.kpm33b_meters.upload_frequency_seconds == 60
+    assert first.kpm33b_meters.upload_frequency_seconds == 30
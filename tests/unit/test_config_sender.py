@@ -1,10 +1,14 @@
 """Unit tests for src/config_sender.py."""
 
 import json
+import os
 import threading
+import time
+from concurrent.futures import Future
 from unittest.mock import MagicMock, patch
 
 import pytest
+import yaml
 
 from src.config import AppConfig
 from src.config_sender import ACK_TIMEOUT, ConfigSender, _make_oprid, _meter_id_last8
@@ -61,7 +65,9 @@ class TestMeterDiscovery:
             sender._on_central_message(None, None, msg)
 
         assert "33B1225950027" in sender.known_meters
-        mock_send.assert_called_once_with("33B1225950027")
+        # Config is sent from the worker thread, not from the paho callback
+        mock_send.assert_not_called()
+        assert sender._config_queue.get_nowait() == "33B1225950027"
 
     def test_duplicate_meter_not_resent(self, sender):
         sender.known_meters.add("33B1225950027")
@@ -73,6 +79,7 @@ class TestMeterDiscovery:
             sender._on_central_message(None, None, msg)
 
         mock_send.assert_not_called()
+        assert sender._config_queue.empty()
 
     def test_short_topic_ignored(self, sender):
         msg = MagicMock()
@@ -83,6 +90,74 @@ class TestMeterDiscovery:
             sender._on_central_message(None, None, msg)
 
         mock_send.assert_not_called()
+        assert sender._config_queue.empty()
+
+    def test_foreign_topic_ignored(self, sender):
+        msg = MagicMock()
+        msg.topic = "other/33B1225950027/seconds"
+        msg.payload = b'{}'
+
+        sender._on_central_message(None, None, msg)
+
+        assert sender.known_meters == set()
+        assert sender._config_queue.empty()
+
+
+class TestConfigWorker:
+    def test_worker_sends_queued_meters(self, sender):
+        sender._config_queue.put("33B1225950027")
+        sender._config_queue.put("33B1225950028")
+        sender._config_queue.put(None)
+
+        with patch.object(sender, "_send_config_jobs") as mock_send:
+            sender._config_worker_loop()
+
+        # Meters waiting in the queue are configured as one batch
+        mock_send.assert_called_once_with([(["33B1225950027", "33B1225950028"], None)])
+
+    def test_worker_batches_reload_job_with_discoveries(self, sender):
+        sender._config_queue.put((["33B1225950027"], [("0000", "10")]))
+        sender._config_queue.put("33B1225950028")
+        sender._config_queue.put(None)
+
+        with patch.object(sender, "_send_config_jobs") as mock_send:
+            sender._config_worker_loop()
+
+        mock_send.assert_called_once_with([(["33B1225950028"], None), (["33B1225950027"], [("0000", "10")])])
+
+    def test_worker_survives_failed_batch(self, sender):
+        batches = []
+
+        def send(jobs):
+            batches.append(jobs[0][0])
+            if len(batches) == 1:
+                sender._config_queue.put("33B1225950028")
+                sender._config_queue.put(None)
+                raise RuntimeError("publish failed")
+
+        sender._config_queue.put("33B1225950027")
+        with patch.object(sender, "_send_config_jobs", side_effect=send):
+            sender._config_worker_loop()
+
+        assert batches == [["33B1225950027"], ["33B1225950028"]]
+
+    def test_publish_exception_skips_only_that_meter(self, sender):
+        def publish(topic, payload, qos):
+            if topic == "MQTT_COMMOD_SET_25950027":
+                raise OSError("socket gone")
+            return MagicMock(rc=0)
+
+        sender.internal_client.publish = MagicMock(side_effect=publish)
+        with patch("src.config_sender.ACK_TIMEOUT", 0.0):
+            sender._send_config_to_meters(["33B1225950027", "33B1225950028"])
+
+        topics = [c.args[0] for c in sender.internal_client.publish.call_args_list]
+        assert topics.count("MQTT_COMMOD_SET_25950028") == 2
+        assert sender._pending_acks == {}
+
+    def test_stop_ends_worker(self, sender):
+        sender.stop()
+        assert sender._config_queue.get_nowait() is None
 
 
 class TestCentralConnect:
@@ -127,18 +202,29 @@ class TestSendConfig:
         assert payload["Cmd"] == "0001"
         assert payload["value"] == "1"
 
+    def test_all_commands_published_before_waiting(self, sender):
+        with patch("src.config_sender.ACK_TIMEOUT", 0.0):
+            sender._send_config_to_meters(["33B1225950027", "33B1225950028"])
+        topics = [c.args[0] for c in sender.internal_client.publish.call_args_list]
+        assert topics == ["MQTT_COMMOD_SET_25950027"] * 2 + ["MQTT_COMMOD_SET_25950028"] * 2
+
+    def test_unacked_commands_cleared_after_timeout(self, sender):
+        with patch("src.config_sender.ACK_TIMEOUT", 0.0):
+            sender._send_config_to_meter("33B1225950027")
+        assert sender._pending_acks == {}
+
 
 class TestAckHandling:
     def test_ack_received_clears_pending(self, sender):
-        event = threading.Event()
-        sender._pending_acks["abc123"] = event
+        ack = Future()
+        sender._pending_acks["abc123"] = ack
         msg = MagicMock()
         msg.topic = "MQTT_COMMOD_SET_REP"
         msg.payload = json.dumps({"oprid": "abc123"}).encode()
 
         sender._on_internal_message(None, None, msg)
 
-        assert event.is_set()
+        assert ack.result(timeout=0) == {"oprid": "abc123"}
         assert "abc123" not in sender._pending_acks
 
     def test_unknown_oprid_ignored(self, sender):
@@ -168,17 +254,19 @@ class TestConfigMtimeMonitoring:
         cfg_file = tmp_path / "config.yaml"
         cfg_file.write_text("test: true")
         sender._config_path = cfg_file
-        sender._config_mtime = 0.0
+        sender._config_signature = None
 
         sender._check_config_mtime()
 
-        assert sender._config_mtime > 0.0
+        st = cfg_file.stat()
+        assert sender._config_signature == (st.st_ino, st.st_size, st.st_mtime_ns)
 
     def test_unchanged_file_no_resend(self, sender, tmp_path):
         cfg_file = tmp_path / "config.yaml"
         cfg_file.write_text("test: true")
         sender._config_path = cfg_file
-        sender._config_mtime = cfg_file.stat().st_mtime
+        sender._config_signature = None
+        sender._check_config_mtime()  # record the current signature
         sender.known_meters = {"33B1225950027"}
 
         with patch.object(sender, "_send_config_to_meter") as mock_send:
@@ -186,30 +274,137 @@ class TestConfigMtimeMonitoring:
 
         mock_send.assert_not_called()
 
+    @staticmethod
+    def _write_config(sender, cfg_file, **meter_overrides):
+        raw = sender.config.model_dump()
+        raw["kpm33b_meters"].update(meter_overrides)
+        cfg_file.write_text(yaml.dump(raw))
+
     def test_changed_file_triggers_resend(self, sender, tmp_path):
         cfg_file = tmp_path / "config.yaml"
-        cfg_file.write_text("test: true")
+        self._write_config(sender, cfg_file, upload_frequency_seconds=10)
         sender._config_path = cfg_file
-        sender._config_mtime = cfg_file.stat().st_mtime - 10  # simulate older mtime
+        sender._config_signature = (0, 0, 0)  # simulate a previously seen, different file
         sender.known_meters = {"33B1225950027", "33B1225950028"}
 
-        with patch.object(sender, "_send_config_to_meter") as mock_send:
+        with patch.object(sender, "_send_config_jobs") as mock_send:
             sender._check_config_mtime()
 
-        assert mock_send.call_count == 2
+        # The monitor thread only queues the job; the worker sends it and waits for the acks
+        mock_send.assert_not_called()
+        meter_ids, commands = sender._config_queue.get_nowait()
+        assert sorted(meter_ids) == ["33B1225950027", "33B1225950028"]
+        # Only the changed seconds frequency is sent
+        assert commands == [("0000", "10")]
+        assert sender.config.kpm33b_meters.upload_frequency_seconds == 10
+
+    def test_touched_file_without_changes_no_resend(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        self._write_config(sender, cfg_file)
+        sender._config_path = cfg_file
+        sender._config_signature = (0, 0, 0)
+        sender.known_meters = {"33B1225950027"}
+
+        sender._check_config_mtime()
+
+        assert sender._config_queue.empty()
+
+    def test_excluded_meters_not_reconfigured(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        self._write_config(sender, cfg_file, upload_frequency_minutes=5, exclude_device_ids=["33B1225950028"])
+        sender._config_path = cfg_file
+        sender._config_signature = (0, 0, 0)
+        sender.known_meters = {"33B1225950027", "33B1225950028"}
+
+        sender._check_config_mtime()
+
+        assert sender._config_queue.get_nowait() == (["33B1225950027"], [("0001", "5")])
+
+    def test_invalid_config_keeps_current(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        cfg_file.write_text("test: true")
+        sender._config_path = cfg_file
+        sender._config_signature = (0, 0, 0)
+        sender.known_meters = {"33B1225950027"}
+        old_config = sender.config
+
+        sender._check_config_mtime()
+
+        assert sender._config_queue.empty()
+        assert sender.config is old_config
+
+    def test_restored_older_file_triggers_reload(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        self._write_config(sender, cfg_file)
+        sender._config_path = cfg_file
+        sender._config_signature = None
+        sender._check_config_mtime()
+
+        # e.g. a backup copied back with `cp -p`: different content, older mtime
+        self._write_config(sender, cfg_file, upload_frequency_seconds=60)
+        old_mtime = cfg_file.stat().st_mtime - 3600
+        os.utime(cfg_file, (old_mtime, old_mtime))
+        with patch.object(sender, "_reload_config") as mock_reload:
+            sender._check_config_mtime()
+
+        mock_reload.assert_called_once()
 
     def test_missing_config_file_no_error(self, sender, tmp_path):
         sender._config_path = tmp_path / "nonexistent.yaml"
         sender._check_config_mtime()
         # No error raised
 
+    def test_monitor_loop_reacts_to_file_change(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        cfg_file.write_text("test: true")
+        sender._config_path = cfg_file
+        checked = threading.Event()
+
+        with patch.object(sender, "_check_config_mtime", side_effect=lambda: checked.set()) as mock_check:
+            monitor = threading.Thread(target=sender._monitor_config_loop)
+            monitor.start()
+            assert checked.wait(timeout=5.0)  # initial check on startup
+            checked.clear()
+            time.sleep(0.2)  # let the watcher settle before modifying the file
+            cfg_file.write_text("test: false")
+            assert checked.wait(timeout=5.0)
+            sender._stop_monitor()
+            monitor.join(timeout=5.0)
+
+        assert not monitor.is_alive()
+        assert mock_check.call_count >= 2
+
+    def test_monitor_loop_survives_failed_check(self, sender, tmp_path):
+        cfg_file = tmp_path / "config.yaml"
+        cfg_file.write_text("test: true")
+        sender._config_path = cfg_file
+        checked = threading.Event()
+
+        def check():
+            checked.set()
+            raise RuntimeError("boom")
+
+        with patch.object(sender, "_check_config_mtime", side_effect=check):
+            monitor = threading.Thread(target=sender._monitor_config_loop)
+            monitor.start()
+            assert checked.wait(timeout=5.0)  # initial check raises
+            checked.clear()
+            time.sleep(0.2)
+            cfg_file.write_text("test: false")
+            assert checked.wait(timeout=5.0)  # still watching after the failure
+            assert monitor.is_alive()
+            sender._stop_monitor()
+            monitor.join(timeout=5.0)
+
+        assert not monitor.is_alive()
+
 
 class TestStartStop:
     def test_start_calls_loop_start(self, sender):
         sender.start()
         sender.central_client.loop_start.assert_called_once()
         sender.internal_client.loop_start.assert_called_once()
-        sender._stop_event.set()  # stop the monitor thread
+        sender.stop()  # stop the monitor and config worker threads
 
     def test_stop_disconnects(self, sender):
         sender.stop()
@@ -0,0 +1,56 @@
+"""Unit tests for src/entrypoint.py."""
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src import entrypoint
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def listener_handler():
+    """Stand-in for setup_logging: a real QueueListener feeding a list handler."""
+    handler = _ListHandler()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    logger = logging.getLogger(entrypoint.__name__)
+    logger.addHandler(queue_handler)
+    yield listener, handler
+    logger.removeHandler(queue_handler)
+
+
+class TestRun:
+    def test_connect_failure_is_logged_and_flushed(self, listener_handler):
+        listener, handler = listener_handler
+        service = MagicMock()
+        service.connect.side_effect = OSError("broker unreachable")
+        config = MagicMock()
+        config.logging.level = "INFO"
+
+        with patch.object(entrypoint, "load_config", return_value=config), \
+                patch.object(entrypoint, "setup_logging", return_value=listener), \
+                patch.object(entrypoint.signal, "signal"):
+            with pytest.raises(OSError):
+                entrypoint.run(lambda cfg: service, "running")
+
+        # The listener was stopped (and therefore drained) before run() gave up
+        assert listener._thread is None
+        errors = [r for r in handler.records if r.levelno == logging.ERROR]
+        assert len(errors) == 1
+        # QueueHandler formats the traceback into the message before queueing
+        assert "broker unreachable" in errors[0].getMessage()
+        service.start.assert_not_called()
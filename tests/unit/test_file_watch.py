@@ -0,0 +1,83 @@
+"""Unit tests for src/file_watch.py."""
+
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src import file_watch
+from src.file_watch import FileWatch
+
+needs_inotify = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+
+
+def _wait_in_thread(watch: FileWatch) -> tuple[threading.Thread, list]:
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(watch.wait()), daemon=True)
+    waiter.start()
+    return waiter, result
+
+
+@pytest.fixture
+def cfg_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("test: true")
+    return path
+
+
+@needs_inotify
+class TestInotifyWatch:
+    def test_blocking_on_linux(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            assert watch.blocking
+
+    def test_write_reported(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            cfg_file.write_text("test: false")
+            assert watch.wait() is True
+
+    def test_atomic_replace_reported(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            tmp = cfg_file.with_name("config.yaml.tmp")
+            tmp.write_text("test: false")
+            os.replace(tmp, cfg_file)
+            assert watch.wait() is True
+
+    def test_other_file_ignored(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            waiter, result = _wait_in_thread(watch)
+            cfg_file.with_name("other.yaml").write_text("x: 1")
+            waiter.join(timeout=0.3)
+            assert waiter.is_alive()  # still blocked: the event was for another file
+            watch.close()
+            waiter.join(timeout=5.0)
+            assert result == [False]
+
+    def test_close_wakes_blocked_wait(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            waiter, result = _wait_in_thread(watch)
+            watch.close()
+            waiter.join(timeout=5.0)
+            assert result == [False]
+
+    def test_close_before_wait(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            watch.close()
+            assert watch.wait() is False
+
+    def test_close_after_exit_is_harmless(self, cfg_file):
+        with FileWatch(cfg_file) as watch:
+            pass
+        watch.close()
+
+
+class TestPollingFallback:
+    def test_polls_without_inotify(self, cfg_file):
+        with patch.object(file_watch, "_inotify_init1", None), patch.object(file_watch, "POLL_INTERVAL", 0.01):
+            with FileWatch(cfg_file) as watch:
+                assert not watch.blocking
+                assert watch.wait() is True
+                watch.close()
+                assert watch.wait() is False
@@ -45,6 +45,11 @@ class TestPowerDiscoveryPayload:
         assert isinstance(json_str, str)
         assert METER_ID in json_str
 
+    def test_payloads_do_not_share_state(self):
+        payload = make_power_discovery_payload(METER_ID, BASE_TOPIC)
+        payload["name"] = "changed"
+        assert make_power_discovery_payload(METER_ID, BASE_TOPIC)["name"] == "Active Power"
+
 
 class TestEnergyDiscoveryPayload:
     def test_required_fields(self):
@@ -243,3 +248,27 @@ class TestManufacturer:
     def test_energy_device_has_correct_manufacturer(self):
         payload = make_energy_discovery_payload(METER_ID, BASE_TOPIC)
         assert payload["device"]["manufacturer"] == "compere-power.com"
+
+
+class TestDiscoveryCache:
+    def test_republish_uses_cached_payloads(self):
+        client = MagicMock()
+        client.publish.return_value = MagicMock(rc=0)
+
+        publish_discovery(client, METER_ID, BASE_TOPIC)
+        publish_discovery(client, METER_ID, BASE_TOPIC)
+
+        first, second = client.publish.call_args_list[0], client.publish.call_args_list[2]
+        assert first.args[1] is second.args[1]
+
+    def test_changed_frequency_not_served_from_cache(self):
+        client = MagicMock()
+        client.publish.return_value = MagicMock(rc=0)
+
+        publish_discovery(client, METER_ID, BASE_TOPIC, upload_freq_seconds=10)
+        publish_discovery(client, METER_ID, BASE_TOPIC, upload_freq_seconds=20)
+
+        first = json.loads(client.publish.call_args_list[0].args[1])
+        second = json.loads(client.publish.call_args_list[2].args[1])
+        assert first["expire_after"] == 15
+        assert second["expire_after"] == 30
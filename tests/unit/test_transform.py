@@ -1,6 +1,7 @@
 """Unit tests for src/transform.py."""
 
 import json
+from functools import cache
 from pathlib import Path
 
 import pytest
@@ -10,8 +11,14 @@ from src.transform import IsendError, transform_eny_now, transform_rt_data
 TEST_MSG_DIR = Path(__file__).resolve().parent.parent / "test_msg"
 
 
+@cache
+def _fixture_text(name: str) -> str:
+    return (TEST_MSG_DIR / name).read_text()
+
+
 def _load_fixture(name: str) -> dict:
-    return json.loads((TEST_MSG_DIR / name).read_text())
+    # Parsed per call so tests can mutate the returned dict; only the file read is cached
+    return json.loads(_fixture_text(name))
 
 
 class TestTransformRtData: